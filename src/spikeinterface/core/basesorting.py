@@ -11,6 +11,9 @@ from .waveform_tools import has_exceeding_spikes
 
 minimum_spike_dtype = [("sample_index", "int64"), ("unit_index", "int64"), ("segment_index", "int64")]
 
+# smaller dtype for the spike vector used when values fit (see to_spike_vector(compact=True))
+compact_spike_dtype = [("sample_index", "int32"), ("unit_index", "int16"), ("segment_index", "int16")]
+
 
 class BaseSorting(BaseExtractor):
     """
@@ -551,7 +554,7 @@ class BaseSorting(BaseExtractor):
         pass
 
     def to_spike_vector(
-        self, concatenated=True, extremum_channel_inds=None, use_cache=True
+        self, concatenated=True, extremum_channel_inds=None, use_cache=True, compact=False
     ) -> np.ndarray | list[np.ndarray]:
         """
         Construct a unique structured numpy vector concatenating all spikes
@@ -563,13 +566,21 @@ class BaseSorting(BaseExtractor):
         concatenated : bool, default: True
             With concatenated=True the output is one numpy "spike vector" with spikes from all segments.
             With concatenated=False the output is a list "spike vector" by segment.
-        extremum_channel_inds : None or dict, default: None
+        extremum_channel_inds : None or dict or np.array, default: None
             If a dictionnary of unit_id to channel_ind is given then an extra field "channel_index".
             This can be convinient for computing spikes postion after sorter.
             This dict can be computed with `get_template_extremum_channel(we, outputs="index")`
+            An array of channel_ind indexed by unit index is also accepted, as given by
+            `get_template_extremum_channel(we, outputs="array")`
         use_cache : bool, default: True
             When True the spikes vector is cached as an attribute of the object (`_cached_spike_vector`).
             This caching only occurs when extremum_channel_inds=None.
+        compact : bool, default: False
+            If True, the fields are downcasted to `compact_spike_dtype` (int32 for "sample_index" and
+            int16 for "unit_index", "segment_index" and "channel_index") when all values fit in it.
+            This makes the spike vector about 3x smaller which speeds up any pass over it.
+            If the values do not fit, the int64 spike vector is returned.
+            Note that the compact vector is a copy and is never cached.
 
         Returns
         -------
@@ -583,7 +594,13 @@ class BaseSorting(BaseExtractor):
         spike_dtype = minimum_spike_dtype
         if extremum_channel_inds is not None:
             spike_dtype = spike_dtype + [("channel_index", "int64")]
-            ext_channel_inds = np.array([extremum_channel_inds[unit_id] for unit_id in self.unit_ids])
+            if isinstance(extremum_channel_inds, np.ndarray):
+                assert (
+                    extremum_channel_inds.size == self.unit_ids.size
+                ), "extremum_channel_inds must have one value per unit"
+                ext_channel_inds = extremum_channel_inds
+            else:
+                ext_channel_inds = np.array([extremum_channel_inds[unit_id] for unit_id in self.unit_ids])
 
         if use_cache and self._cached_spike_vector is None:
             self._custom_cache_spike_vector()
@@ -644,6 +661,12 @@ class BaseSorting(BaseExtractor):
                 else:
                     self._cached_spike_vector = np.concatenate(spikes)
 
+        if compact:
+            if concatenated:
+                spikes = _to_compact_spike_vector(spikes)
+            else:
+                spikes = [_to_compact_spike_vector(spikes_in_seg) for spikes_in_seg in spikes]
+
         return spikes
 
     def to_numpy_sorting(self, propagate_cache=True):
@@ -707,6 +730,23 @@ class BaseSorting(BaseExtractor):
                 return SharedMemorySorting.from_sorting(self)
 
 
+def _to_compact_spike_vector(spikes):
+    """
+    Downcast a spike vector to compact_spike_dtype (+ int16 "channel_index") when all values fit.
+    Otherwise the spike vector is returned untouched.
+    """
+    spike_dtype = compact_spike_dtype
+    if "channel_index" in spikes.dtype.names:
+        spike_dtype = spike_dtype + [("channel_index", "int16")]
+
+    if spikes.size > 0:
+        for name, dtype in spike_dtype:
+            if spikes[name].max() > np.iinfo(dtype).max:
+                return spikes
+
+    return spikes.astype(spike_dtype)
+
+
 class BaseSortingSegment(BaseSegment):
     """
     Abstract class representing several units and relative spiketrain inside a segment.
@@ -159,8 +159,10 @@ class SpikeRetriever(PeakSource):
     channel_from_template: bool, default: True
         If True, then the channel_index is inferred from the template and `extremum_channel_inds` must be provided.
         If False, the max channel is computed for each spike given a radius around the template max channel.
-    extremum_channel_inds: dict of int | None, default: None
+    extremum_channel_inds: dict of int | np.array | None, default: None
         The extremum channel index dict given from template.
+        An array of channel indices indexed by unit index (`get_template_extremum_channel(..., outputs="array")`)
+        is also accepted and avoids the dict lookup.
     radius_um: float, default: 50
         The radius to find the real max channel.
         Used only when channel_from_template=False
@@ -185,7 +187,7 @@ class SpikeRetriever(PeakSource):
 
         self.channel_from_template = channel_from_template
 
-        assert extremum_channel_inds is not None, "SpikeRetriever needs the extremum_channel_inds dictionary"
+        assert extremum_channel_inds is not None, "SpikeRetriever needs the extremum_channel_inds dictionary or array"
 
         self._dtype = spike_peak_dtype
 
@@ -200,11 +202,14 @@ class SpikeRetriever(PeakSource):
             self.neighbours_mask = channel_distance <= radius_um
             self.peak_sign = peak_sign
 
-        # precompute segment slice
+        # precompute segment slice and a contiguous copy of the sample index of each segment,
+        # so that the per chunk searchsorted does not read the strided field of the structured array
         self.segment_slices = []
+        self.segment_sample_indices = []
         for segment_index in range(recording.get_num_segments()):
             i0, i1 = np.searchsorted(self.peaks["segment_index"], [segment_index, segment_index + 1])
             self.segment_slices.append(slice(i0, i1))
+            self.segment_sample_indices.append(np.ascontiguousarray(self.peaks["sample_index"][i0:i1]))
 
     def get_trace_margin(self):
         return 0
@@ -216,12 +221,11 @@ class SpikeRetriever(PeakSource):
         # get local peaks
         sl = self.segment_slices[segment_index]
         peaks_in_segment = self.peaks[sl]
+        sample_indices = self.segment_sample_indices[segment_index]
         if self.include_spikes_in_margin:
-            i0, i1 = np.searchsorted(
-                peaks_in_segment["sample_index"], [start_frame - max_margin, end_frame + max_margin]
-            )
+            i0, i1 = np.searchsorted(sample_indices, [start_frame - max_margin, end_frame + max_margin])
         else:
-            i0, i1 = np.searchsorted(peaks_in_segment["sample_index"], [start_frame, end_frame])
+            i0, i1 = np.searchsorted(sample_indices, [start_frame, end_frame])
         local_peaks = peaks_in_segment[i0:i1]
 
         # make sample index local to traces
@@ -237,20 +241,18 @@ class SpikeRetriever(PeakSource):
             local_peaks["in_margin"][mask] = True
 
         if not self.channel_from_template:
-            # handle channel spike per spike
-            for i, peak in enumerate(local_peaks):
-                chans = np.flatnonzero(self.neighbours_mask[peak["channel_index"]])
-                sparse_wfs = traces[peak["sample_index"], chans]
-                if self.peak_sign == "neg":
-                    local_peaks[i]["channel_index"] = chans[np.argmin(sparse_wfs)]
-                elif self.peak_sign == "pos":
-                    local_peaks[i]["channel_index"] = chans[np.argmax(sparse_wfs)]
-                elif self.peak_sign == "both":
-                    local_peaks[i]["channel_index"] = chans[np.argmax(np.abs(sparse_wfs))]
+            # handle channel for all spikes at once: channels outside the neighbourhood are masked
+            peak_values = traces[local_peaks["sample_index"], :]
+            neighbours_mask = self.neighbours_mask[local_peaks["channel_index"]]
+            if self.peak_sign == "neg":
+                local_peaks["channel_index"] = np.argmin(np.where(neighbours_mask, peak_values, np.inf), axis=1)
+            elif self.peak_sign == "pos":
+                local_peaks["channel_index"] = np.argmax(np.where(neighbours_mask, peak_values, -np.inf), axis=1)
+            elif self.peak_sign == "both":
+                local_peaks["channel_index"] = np.argmax(np.where(neighbours_mask, np.abs(peak_values), -1), axis=1)
 
         # handle amplitude
-        for i, peak in enumerate(local_peaks):
-            local_peaks["amplitude"][i] = traces[peak["sample_index"], peak["channel_index"]]
+        local_peaks["amplitude"] = traces[local_peaks["sample_index"], local_peaks["channel_index"]]
 
         return (local_peaks,)
 
@@ -259,7 +261,11 @@ def sorting_to_peaks(sorting, extremum_channel_inds, dtype=spike_peak_dtype):
     spikes = sorting.to_spike_vector()
     peaks = np.zeros(spikes.size, dtype=dtype)
     peaks["sample_index"] = spikes["sample_index"]
-    extremum_channel_inds_ = np.array([extremum_channel_inds[unit_id] for unit_id in sorting.unit_ids])
+    if isinstance(extremum_channel_inds, np.ndarray):
+        assert extremum_channel_inds.size == sorting.unit_ids.size, "extremum_channel_inds must have one value per unit"
+        extremum_channel_inds_ = extremum_channel_inds
+    else:
+        extremum_channel_inds_ = np.array([extremum_channel_inds[unit_id] for unit_id in sorting.unit_ids])
     peaks["channel_index"] = extremum_channel_inds_[spikes["unit_index"]]
     peaks["amplitude"] = 0.0
     peaks["segment_index"] = spikes["segment_index"]
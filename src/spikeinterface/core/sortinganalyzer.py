@@ -207,6 +207,11 @@ class SortingAnalyzer:
         # extensions are not loaded at init
         self.extensions = dict()
 
+        # extremum channels and spike vectors with "channel_index" by peak_sign, shared across extensions.
+        # each entry keeps the object it was computed from to detect when the templates change
+        self._extremum_channel_indices_cache = dict()
+        self._spike_vector_with_extremum_channel_cache = dict()
+
     def __repr__(self) -> str:
         clsname = self.__class__.__name__
         nseg = self.get_num_segments()
@@ -1061,7 +1066,7 @@ class SortingAnalyzer:
 
             for r, result in enumerate(results):
                 extension_name, variable_name = result_routage[r]
-                extension_instances[extension_name].data[variable_name] = result
+                extension_instances[extension_name]._set_pipeline_data(variable_name, result)
 
             for extension_name, extension_instance in extension_instances.items():
                 self.extensions[extension_name] = extension_instance
@@ -1175,6 +1180,10 @@ class SortingAnalyzer:
         # remove from dict
         self.extensions.pop(extension_name, None)
 
+        if extension_name == "templates":
+            self._extremum_channel_indices_cache.clear()
+            self._spike_vector_with_extremum_channel_cache.clear()
+
     def get_loaded_extension_names(self):
         """
         Return the loaded or already computed extensions names.
@@ -1216,6 +1225,58 @@ class SortingAnalyzer:
         """
         return get_default_analyzer_extension_params(extension_name)
 
+    def get_extremum_channel_indices(self, peak_sign: str = "neg") -> np.ndarray:
+        """
+        Get the extremum channel index of each unit, computed from the "templates" extension.
+
+        The result is cached per peak_sign and computed again only when the templates are recomputed.
+
+        Parameters
+        ----------
+        peak_sign : "neg" | "pos" | "both", default: "neg"
+            Sign of the template to find extremum channels
+
+        Returns
+        -------
+        extremum_channel_indices : np.array
+            The channel indices with shape (num_units,), indexed by unit index
+        """
+        from .template_tools import get_template_extremum_channel
+
+        templates_ext = self.get_extension("templates")
+        if templates_ext is None:
+            raise ValueError("SortingAnalyzer need extension 'templates' to get the extremum channels")
+
+        cached = self._extremum_channel_indices_cache.get(peak_sign)
+        if cached is None or cached[0] is not templates_ext:
+            extremum_channel_indices = get_template_extremum_channel(self, peak_sign=peak_sign, outputs="array")
+            self._extremum_channel_indices_cache[peak_sign] = (templates_ext, extremum_channel_indices)
+        return self._extremum_channel_indices_cache[peak_sign][1]
+
+    def get_spike_vector_with_extremum_channel(self, peak_sign: str = "neg") -> np.ndarray:
+        """
+        Get the spike vector of the sorting with an additional "channel_index" field which is the
+        extremum channel of the unit given by `get_extremum_channel_indices()`.
+
+        The result is cached per peak_sign and shared: it must not be modified.
+
+        Parameters
+        ----------
+        peak_sign : "neg" | "pos" | "both", default: "neg"
+            Sign of the template to find extremum channels
+
+        Returns
+        -------
+        spikes : np.array
+            The spike vector with the "channel_index" field
+        """
+        extremum_channel_indices = self.get_extremum_channel_indices(peak_sign=peak_sign)
+        cached = self._spike_vector_with_extremum_channel_cache.get(peak_sign)
+        if cached is None or cached[0] is not extremum_channel_indices:
+            spikes = self.sorting.to_spike_vector(extremum_channel_inds=extremum_channel_indices)
+            self._spike_vector_with_extremum_channel_cache[peak_sign] = (extremum_channel_indices, spikes)
+        return self._spike_vector_with_extremum_channel_cache[peak_sign][1]
+
 
 def _sort_extensions_by_dependency(extensions):
     """
@@ -1425,10 +1486,12 @@ class AnalyzerExtension:
       * use_nodepipeline
       * nodepipeline_variables only if use_nodepipeline=True
       * need_job_kwargs
+      * need_save_in_run optionally, if True `save` is also given to _run()
       * _set_params()
       * _run()
       * _select_extension_data()
       * _get_data()
+      * _set_pipeline_data() optionally, only if use_nodepipeline=True
 
     The subclass must also set an `extension_name` class attribute which is not None by default.
 
@@ -1446,6 +1509,7 @@ class AnalyzerExtension:
     use_nodepipeline = False
     nodepipeline_variables = None
     need_job_kwargs = False
+    need_save_in_run = False
 
     def __init__(self, sorting_analyzer):
         self._sorting_analyzer = weakref.ref(sorting_analyzer)
@@ -1474,6 +1538,11 @@ class AnalyzerExtension:
         # must be implemented in subclass only if use_nodepipeline=True
         raise NotImplementedError
 
+    def _set_pipeline_data(self, variable_name, result):
+        # can be overwritten in subclass if the output of the pipeline nodes needs to be post-processed.
+        # this is used both by _run() and SortingAnalyzer.compute_several_extensions()
+        self.data[variable_name] = result
+
     def _get_data(self):
         # must be implemented in subclass
         raise NotImplementedError
@@ -1637,7 +1706,10 @@ class AnalyzerExtension:
             self._save_params()
             self._save_importing_provenance()
 
-        self._run(**kwargs)
+        if self.need_save_in_run:
+            self._run(save=save, **kwargs)
+        else:
+            self._run(**kwargs)
 
         if save and not self.sorting_analyzer.is_read_only():
             self._save_data(**kwargs)
@@ -124,7 +124,7 @@ def get_template_extremum_channel(
     templates_or_sorting_analyzer,
     peak_sign: "neg" | "pos" | "both" = "neg",
     mode: "extremum" | "at_index" | "peak_to_peak" = "extremum",
-    outputs: "id" | "index" = "id",
+    outputs: "id" | "index" | "array" = "id",
 ):
     """
     Compute the channel with the extremum peak for each unit.
@@ -140,19 +140,20 @@ def get_template_extremum_channel(
         * "extremum" : take the peak value (max or min depending on `peak_sign`)
         * "at_index" : take value at `nbefore` index
         * "peak_to_peak" : take the peak-to-peak amplitude
-    outputs : "id" | "index", default: "id"
+    outputs : "id" | "index" | "array", default: "id"
         * "id" : channel id
         * "index" : channel index
+        * "array" : channel index as a numpy array indexed by unit index
 
     Returns
     -------
-    extremum_channels : dict
+    extremum_channels : dict | np.array
         Dictionary with unit ids as keys and extremum channels (id or index based on "outputs")
-        as values
+        as values. When outputs="array", an int32 array of channel indices with shape (num_units,)
     """
     assert peak_sign in ("both", "neg", "pos"), "`peak_sign` must be one of `both`, `neg`, or `pos`"
     assert mode in ("extremum", "at_index", "peak_to_peak"), "'mode' must be 'extremum', 'at_index', or 'peak_to_peak'"
-    assert outputs in ("id", "index"), "`outputs` must be either `id` or `index`"
+    assert outputs in ("id", "index", "array"), "`outputs` must be either `id`, `index` or `array`"
 
     unit_ids = templates_or_sorting_analyzer.unit_ids
     channel_ids = templates_or_sorting_analyzer.channel_ids
@@ -178,6 +179,8 @@ def get_template_extremum_channel(
         return extremum_channels_id
     elif outputs == "index":
         return extremum_channels_index
+    elif outputs == "array":
+        return np.array([extremum_channels_index[unit_id] for unit_id in unit_ids], dtype="int32")
 
 
 def get_template_extremum_channel_peak_shift(templates_or_sorting_analyzer, peak_sign: "neg" | "pos" | "both" = "neg"):
@@ -105,6 +105,12 @@ def test_BaseSorting():
     assert sorting._cached_spike_vector is not None
     spikes = sorting.to_spike_vector(extremum_channel_inds={0: 15, 1: 5, 2: 18})
     # print(spikes)
+    spikes_from_array = sorting.to_spike_vector(extremum_channel_inds=np.array([15, 5, 18]))
+    assert np.array_equal(spikes["channel_index"], spikes_from_array["channel_index"])
+    compact_spikes = sorting.to_spike_vector(extremum_channel_inds={0: 15, 1: 5, 2: 18}, compact=True)
+    assert compact_spikes.dtype.itemsize < spikes.dtype.itemsize
+    for name in spikes.dtype.names:
+        assert np.array_equal(compact_spikes[name], spikes[name])
 
     num_spikes_per_unit = sorting.count_num_spikes_per_unit(outputs="dict")
     num_spikes_per_unit = sorting.count_num_spikes_per_unit(outputs="array")
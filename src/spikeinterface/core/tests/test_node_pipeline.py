@@ -83,6 +83,10 @@ def test_run_node_pipeline():
 
     peaks = sorting_to_peaks(sorting, extremum_channel_inds, spike_peak_dtype)
 
+    # the array form (indexed by unit index) gives the same peaks
+    extremum_channel_array = get_template_extremum_channel(sorting_analyzer, peak_sign="neg", outputs="array")
+    assert np.array_equal(peaks, sorting_to_peaks(sorting, extremum_channel_array, spike_peak_dtype))
+
     peak_retriever = PeakRetriever(recording, peaks)
     # channel index is from template
     spike_retriever_T = SpikeRetriever(
@@ -98,6 +102,15 @@ def test_run_node_pipeline():
         peak_sign="neg",
     )
 
+    # channel and amplitude per spike match a spike by spike estimation
+    num_samples = recording.get_num_samples(0)
+    traces = recording.get_traces(start_frame=0, end_frame=num_samples, segment_index=0)
+    (local_peaks,) = spike_retriever_S.compute(traces, 0, num_samples, 0, 0)
+    for peak, spike_peak in zip(local_peaks, peaks):
+        chans = np.flatnonzero(spike_retriever_S.neighbours_mask[spike_peak["channel_index"]])
+        assert peak["channel_index"] == chans[np.argmin(traces[peak["sample_index"], chans])]
+        assert peak["amplitude"] == traces[peak["sample_index"], peak["channel_index"]]
+
     # test with 3 differents first nodes
     for loop, peak_source in enumerate((peak_retriever, spike_retriever_T, spike_retriever_S)):
         # one step only : squeeze output
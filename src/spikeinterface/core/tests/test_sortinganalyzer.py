@@ -288,6 +288,35 @@ def test_extensions_sorting():
     assert list(sorted_extensions_4.keys()) == list(extensions_qm_correct.keys())
 
 
+def test_extremum_channel_cache():
+    from spikeinterface.core import get_template_extremum_channel
+
+    recording, sorting = get_dataset()
+    sorting_analyzer = create_sorting_analyzer(sorting, recording, format="memory", sparse=False)
+    with pytest.raises(ValueError):
+        sorting_analyzer.get_extremum_channel_indices()
+
+    sorting_analyzer.compute(["random_spikes", "templates"])
+    extremum_channel_indices = sorting_analyzer.get_extremum_channel_indices(peak_sign="neg")
+    expected = get_template_extremum_channel(sorting_analyzer, peak_sign="neg", outputs="array")
+    assert np.array_equal(extremum_channel_indices, expected)
+    spikes = sorting_analyzer.get_spike_vector_with_extremum_channel(peak_sign="neg")
+    assert np.array_equal(spikes["channel_index"], expected[spikes["unit_index"]])
+
+    # cached per peak_sign
+    assert sorting_analyzer.get_extremum_channel_indices(peak_sign="neg") is extremum_channel_indices
+    assert sorting_analyzer.get_spike_vector_with_extremum_channel(peak_sign="neg") is spikes
+    assert sorting_analyzer.get_extremum_channel_indices(peak_sign="pos") is not extremum_channel_indices
+
+    # computed again when the templates change
+    sorting_analyzer.compute("templates")
+    assert sorting_analyzer.get_extremum_channel_indices(peak_sign="neg") is not extremum_channel_indices
+    assert sorting_analyzer.get_spike_vector_with_extremum_channel(peak_sign="neg") is not spikes
+    sorting_analyzer.delete_extension("templates")
+    with pytest.raises(ValueError):
+        sorting_analyzer.get_spike_vector_with_extremum_channel()
+
+
 if __name__ == "__main__":
     tmp_path = Path("test_SortingAnalyzer")
     test_SortingAnalyzer_memory(tmp_path)
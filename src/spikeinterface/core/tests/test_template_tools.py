@@ -67,6 +67,12 @@ def test_get_template_extremum_channel(sorting_analyzer):
     templates = _get_templates_object_from_sorting_analyzer(sorting_analyzer)
     extremum_channels_ids = get_template_extremum_channel(templates, peak_sign="both")
     print(extremum_channels_ids)
+    extremum_channels_index = get_template_extremum_channel(sorting_analyzer, peak_sign="both", outputs="index")
+    extremum_channels_array = get_template_extremum_channel(sorting_analyzer, peak_sign="both", outputs="array")
+    assert extremum_channels_array.dtype == "int32"
+    assert np.array_equal(
+        extremum_channels_array, [extremum_channels_index[unit_id] for unit_id in sorting_analyzer.unit_ids]
+    )
 
 
 def test_get_template_extremum_channel_peak_shift(sorting_analyzer):
@@ -826,6 +826,12 @@ def estimate_templates_with_accumulator(
 
     assert spikes.size > 0, "estimate_templates() need non empty sorting"
 
+    # the spikes of a chunk are found with searchsorted so they must be sorted by sample_index in each segment
+    # (the templates do not depend on the order of spikes)
+    same_segment = spikes["segment_index"][1:] == spikes["segment_index"][:-1]
+    if np.any(np.diff(spikes["sample_index"])[same_segment] < 0):
+        spikes = spikes[np.lexsort((spikes["sample_index"], spikes["segment_index"]))]
+
     job_kwargs = fix_job_kwargs(job_kwargs)
     num_worker = job_kwargs["n_jobs"]
 
@@ -5,7 +5,6 @@ import numpy as np
 from spikeinterface.core import ChannelSparsity, get_chunk_with_margin
 from spikeinterface.core.job_tools import ChunkRecordingExecutor, _shared_job_kwargs_doc, ensure_n_jobs, fix_job_kwargs
 
-from spikeinterface.core.template_tools import get_template_extremum_channel
 
 from spikeinterface.core.sortinganalyzer import register_result_extension, AnalyzerExtension
 
@@ -131,9 +130,7 @@ class ComputeAmplitudeScalings(AnalyzerExtension):
             cut_out_after = nafter
 
         peak_sign = "neg" if np.abs(np.min(all_templates)) > np.max(all_templates) else "pos"
-        extremum_channels_indices = get_template_extremum_channel(
-            self.sorting_analyzer, peak_sign=peak_sign, outputs="index"
-        )
+        extremum_channels_indices = self.sorting_analyzer.get_extremum_channel_indices(peak_sign=peak_sign)
 
         # collisions
         handle_collisions = self.params["handle_collisions"]
@@ -5,7 +5,7 @@ import warnings
 
 from spikeinterface.core.job_tools import fix_job_kwargs
 
-from spikeinterface.core.template_tools import get_template_extremum_channel, get_template_extremum_channel_peak_shift
+from spikeinterface.core.template_tools import get_template_extremum_channel_peak_shift
 
 from spikeinterface.core.sortinganalyzer import register_result_extension, AnalyzerExtension
 from spikeinterface.core.node_pipeline import SpikeRetriever, PipelineNode, run_node_pipeline, find_parent_of_type
@@ -89,9 +89,7 @@ class ComputeSpikeAmplitudes(AnalyzerExtension):
         peak_sign = self.params["peak_sign"]
         return_scaled = self.sorting_analyzer.return_scaled
 
-        extremum_channels_indices = get_template_extremum_channel(
-            self.sorting_analyzer, peak_sign=peak_sign, outputs="index"
-        )
+        extremum_channels_indices = self.sorting_analyzer.get_extremum_channel_indices(peak_sign=peak_sign)
         peak_shifts = get_template_extremum_channel_peak_shift(self.sorting_analyzer, peak_sign=peak_sign)
 
         spike_retriever_node = SpikeRetriever(
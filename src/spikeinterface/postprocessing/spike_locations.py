@@ -2,11 +2,16 @@ from __future__ import annotations
 
 import numpy as np
 
+try:
+    import numba
+
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
 from spikeinterface.core.job_tools import _shared_job_kwargs_doc, fix_job_kwargs
 from spikeinterface.core.sortinganalyzer import register_result_extension, AnalyzerExtension
-from spikeinterface.core.template_tools import get_template_extremum_channel
-
-from spikeinterface.core.sorting_tools import spike_vector_to_indices
+from spikeinterface.core.numpyextractors import NumpySorting
 
 from spikeinterface.core.node_pipeline import SpikeRetriever, run_node_pipeline
 
@@ -39,6 +44,9 @@ class ComputeSpikeLocations(AnalyzerExtension):
         The localization method to use
     method_kwargs : dict, default: dict()
         Other kwargs depending on the method.
+    selected_unit_ids : list | None, default: None
+        If given, only the spikes of these units are localized and the locations of the other spikes are NaN.
+        This is useful when the analyzer will be sliced with `select_units()` afterwards.
     outputs : "concatenated" | "by_unit", default: "concatenated"
         The output format
     {}
@@ -55,12 +63,32 @@ class ComputeSpikeLocations(AnalyzerExtension):
     use_nodepipeline = True
     nodepipeline_variables = ["spike_locations"]
     need_job_kwargs = True
+    # save is given to _run() to write the locations directly in the binary folder
+    need_save_in_run = True
 
     def __init__(self, sorting_analyzer):
         AnalyzerExtension.__init__(self, sorting_analyzer)
 
-        extremum_channel_inds = get_template_extremum_channel(self.sorting_analyzer, outputs="index")
-        self.spikes = self.sorting_analyzer.sorting.to_spike_vector(extremum_channel_inds=extremum_channel_inds)
+        # the spike vector with "channel_index" is cached on the SortingAnalyzer and shared across instances
+        self.spikes = self.sorting_analyzer.get_spike_vector_with_extremum_channel(peak_sign="neg")
+
+        # contiguous copies of the fields used in the hot paths: scanning a field of the structured
+        # spike vector is a strided read over the whole record
+        self._sample_index = np.ascontiguousarray(self.spikes["sample_index"])
+        self._unit_index = np.ascontiguousarray(self.spikes["unit_index"])
+        self._segment_index = np.ascontiguousarray(self.spikes["segment_index"])
+
+        # spike boundaries of each segment in the spike vector, computed once
+        num_segments = self.sorting_analyzer.get_num_segments()
+        self._segment_bounds = np.searchsorted(self._segment_index, np.arange(num_segments + 1))
+
+        # the pipeline reads traces chunk by chunk and needs spikes sorted by sample_index in each segment:
+        # if the spike vector is not, spikes are localized in sorted order and scattered back in _set_pipeline_data
+        same_segment = self._segment_index[1:] == self._segment_index[:-1]
+        if np.any(self._sample_index[1:][same_segment] < self._sample_index[:-1][same_segment]):
+            self._sort_perm = np.lexsort((self._sample_index, self._segment_index))
+        else:
+            self._sort_perm = None
 
     def _set_params(
         self,
@@ -69,6 +97,7 @@ class ComputeSpikeLocations(AnalyzerExtension):
         spike_retriver_kwargs=None,
         method="center_of_mass",
         method_kwargs={},
+        selected_unit_ids=None,
     ):
         spike_retriver_kwargs_ = dict(
             channel_from_template=True,
@@ -77,32 +106,73 @@ class ComputeSpikeLocations(AnalyzerExtension):
         )
         if spike_retriver_kwargs is not None:
             spike_retriver_kwargs_.update(spike_retriver_kwargs)
+        if selected_unit_ids is not None:
+            unknown_unit_ids = [u for u in selected_unit_ids if u not in self.sorting_analyzer.unit_ids]
+            assert len(unknown_unit_ids) == 0, f"selected_unit_ids contains unknown unit ids: {unknown_unit_ids}"
         params = dict(
             ms_before=ms_before,
             ms_after=ms_after,
             spike_retriver_kwargs=spike_retriver_kwargs_,
             method=method,
             method_kwargs=method_kwargs,
+            selected_unit_ids=list(selected_unit_ids) if selected_unit_ids is not None else None,
         )
         return params
 
+    def _get_pipeline_spike_indices(self):
+        """
+        Indices in the spike vector of the spikes given to the pipeline, in pipeline order.
+        None means all spikes in the spike vector order.
+        """
+        spike_indices = self._sort_perm
+        selected_unit_ids = self.params["selected_unit_ids"]
+        if selected_unit_ids is not None:
+            keep_unit_mask = np.isin(self.sorting_analyzer.unit_ids, selected_unit_ids)
+            if spike_indices is None:
+                spike_indices = np.flatnonzero(keep_unit_mask[self._unit_index])
+            else:
+                spike_indices = spike_indices[keep_unit_mask[self._unit_index[spike_indices]]]
+        return spike_indices
+
     def _select_extension_data(self, unit_ids):
         old_unit_ids = self.sorting_analyzer.unit_ids
         unit_inds = np.flatnonzero(np.isin(old_unit_ids, unit_ids))
 
-        spike_mask = np.isin(self.spikes["unit_index"], unit_inds)
-        new_spike_locations = self.data["spike_locations"][spike_mask]
+        if unit_inds.size == old_unit_ids.size:
+            # all units are kept: no need for a spike mask
+            spike_locations = self.data["spike_locations"]
+            if isinstance(spike_locations, np.memmap):
+                # the new extension must not keep a memmap into the folder of this one
+                spike_locations = np.array(spike_locations)
+            return dict(spike_locations=spike_locations)
+
+        # boolean lookup table indexed by unit_index: one gather instead of np.isin
+        keep_unit_mask = np.zeros(old_unit_ids.size, dtype=bool)
+        keep_unit_mask[unit_inds] = True
+        if HAVE_NUMBA and self._unit_index.size > _numba_select_min_num_spikes:
+            # for very large spike vectors the selection is done in parallel by chunks
+            select_spike_indices = get_numba_select_spike_indices()
+            spike_indices = select_spike_indices(self._unit_index, keep_unit_mask, numba.get_num_threads())
+            new_spike_locations = self.data["spike_locations"][spike_indices]
+        else:
+            spike_mask = keep_unit_mask[self._unit_index]
+            new_spike_locations = self.data["spike_locations"][spike_mask]
         return dict(spike_locations=new_spike_locations)
 
     def _get_pipeline_nodes(self):
-        from spikeinterface.sortingcomponents.peak_localization import get_localization_pipeline_nodes
+        from spikeinterface.sortingcomponents.peak_localization import (
+            get_localization_pipeline_nodes,
+            LocalizeCenterOfMassFused,
+        )
 
         recording = self.sorting_analyzer.recording
         sorting = self.sorting_analyzer.sorting
+        spike_indices = self._get_pipeline_spike_indices()
+        if spike_indices is not None:
+            spikes = sorting.to_spike_vector()[spike_indices]
+            sorting = NumpySorting(spikes, sorting.sampling_frequency, sorting.unit_ids)
         peak_sign = self.params["spike_retriver_kwargs"]["peak_sign"]
-        extremum_channels_indices = get_template_extremum_channel(
-            self.sorting_analyzer, peak_sign=peak_sign, outputs="index"
-        )
+        extremum_channels_indices = self.sorting_analyzer.get_extremum_channel_indices(peak_sign=peak_sign)
 
         retriever = SpikeRetriever(
             recording,
@@ -110,28 +180,73 @@ class ComputeSpikeLocations(AnalyzerExtension):
             channel_from_template=True,
             extremum_channel_inds=extremum_channels_indices,
         )
-        nodes = get_localization_pipeline_nodes(
-            recording,
-            retriever,
-            method=self.params["method"],
-            ms_before=self.params["ms_before"],
-            ms_after=self.params["ms_after"],
-            **self.params["method_kwargs"],
-        )
+        # locations are stored in float32: float64 precision is meaningless at the micrometer scale
+        if self.params["method"] == "center_of_mass":
+            # waveforms extraction and center of mass in one node: traces are read only once
+            localize_node = LocalizeCenterOfMassFused(
+                recording,
+                parents=[retriever],
+                ms_before=self.params["ms_before"],
+                ms_after=self.params["ms_after"],
+                dtype="float32",
+                **self.params["method_kwargs"],
+            )
+            nodes = [retriever, localize_node]
+        else:
+            nodes = get_localization_pipeline_nodes(
+                recording,
+                retriever,
+                method=self.params["method"],
+                ms_before=self.params["ms_before"],
+                ms_after=self.params["ms_after"],
+                dtype="float32",
+                **self.params["method_kwargs"],
+            )
         return nodes
 
-    def _run(self, verbose=False, **job_kwargs):
+    def _run(self, verbose=False, save=True, **job_kwargs):
         job_kwargs = fix_job_kwargs(job_kwargs)
         nodes = self.get_pipeline_nodes()
+        spike_indices = self._get_pipeline_spike_indices()
+
+        gather_to_folder = save and self.format == "binary_folder" and not self.sorting_analyzer.is_read_only()
+        if gather_to_folder and spike_indices is None:
+            # in that case locations are written chunk by chunk directly in the npy file and opened as memmap.
+            # Note that, like ComputeWaveforms in binary_folder, the data is then a memmap into the extension folder
+            # which is shared by reference by copy(unit_ids=None)
+            gather_mode = "npy"
+            gather_kwargs = dict(exist_ok=True)
+            folder = self._get_binary_extension_folder()
+            names = ["spike_locations"]
+        else:
+            gather_mode = "memory"
+            gather_kwargs = dict()
+            folder = None
+            names = None
+
         spike_locations = run_node_pipeline(
             self.sorting_analyzer.recording,
             nodes,
             job_kwargs=job_kwargs,
             job_name="spike_locations",
-            gather_mode="memory",
+            gather_mode=gather_mode,
+            gather_kwargs=gather_kwargs,
+            folder=folder,
+            names=names,
             verbose=verbose,
         )
-        self.data["spike_locations"] = spike_locations
+        self._set_pipeline_data("spike_locations", spike_locations)
+
+    def _set_pipeline_data(self, variable_name, result):
+        # the pipeline output follows _get_pipeline_spike_indices(): this is also called by
+        # SortingAnalyzer.compute_several_extensions() which does not go through _run()
+        spike_indices = self._get_pipeline_spike_indices()
+        if spike_indices is not None:
+            # back to the order of the spike vector, spikes not localized are NaN
+            all_spike_locations = np.full(self.spikes.size, np.nan, dtype=result.dtype)
+            all_spike_locations[spike_indices] = result
+            result = all_spike_locations
+        self.data[variable_name] = result
 
     def _get_data(self, outputs="numpy"):
         all_spike_locations = self.data["spike_locations"]
@@ -139,13 +254,18 @@ class ComputeSpikeLocations(AnalyzerExtension):
             return all_spike_locations
         elif outputs == "by_unit":
             unit_ids = self.sorting_analyzer.unit_ids
-            spike_vector = self.sorting_analyzer.sorting.to_spike_vector(concatenated=False)
-            spike_indices = spike_vector_to_indices(spike_vector, unit_ids)
+            num_units = unit_ids.size
             spike_locations_by_units = {}
-            for segment_index in range(self.sorting_analyzer.sorting.get_num_segments()):
+            for segment_index in range(self.sorting_analyzer.get_num_segments()):
+                s0, s1 = self._segment_bounds[segment_index], self._segment_bounds[segment_index + 1]
+                # bucket the spikes of the segment by unit with one sort instead of one mask per unit
+                order = np.argsort(self._unit_index[s0:s1], kind="stable")
+                sorted_unit_index = self._unit_index[s0:s1][order]
+                bounds = np.searchsorted(sorted_unit_index, np.arange(num_units + 1))
+                order += s0
                 spike_locations_by_units[segment_index] = {}
-                for unit_id in unit_ids:
-                    inds = spike_indices[segment_index][unit_id]
+                for unit_ind, unit_id in enumerate(unit_ids):
+                    inds = order[bounds[unit_ind] : bounds[unit_ind + 1]]
                     spike_locations_by_units[segment_index][unit_id] = all_spike_locations[inds]
             return spike_locations_by_units
         else:
@@ -156,3 +276,45 @@ ComputeSpikeLocations.__doc__.format(_shared_job_kwargs_doc)
 
 register_result_extension(ComputeSpikeLocations)
 compute_spike_locations = ComputeSpikeLocations.function_factory()
+
+
+# above this number of spikes, units selection uses the parallel numba implementation
+_numba_select_min_num_spikes = 50_000_000
+
+
+def get_numba_select_spike_indices():
+    if hasattr(get_numba_select_spike_indices, "_cached_numba_function"):
+        return get_numba_select_spike_indices._cached_numba_function
+
+    import numba
+
+    @numba.jit(nopython=True, parallel=True, nogil=True, cache=False)
+    def select_spike_indices_numba(unit_index, keep_unit_mask, num_chunks):
+        """
+        Parallel equivalent of np.flatnonzero(keep_unit_mask[unit_index]).
+        Each chunk counts its selected spikes, a prefix sum gives the output offsets
+        and then each chunk writes its indices.
+        """
+        num_spikes = unit_index.size
+        chunk_size = (num_spikes + num_chunks - 1) // num_chunks
+        counts = np.zeros(num_chunks + 1, dtype=np.int64)
+        for c in numba.prange(num_chunks):
+            n = 0
+            for i in range(c * chunk_size, min((c + 1) * chunk_size, num_spikes)):
+                if keep_unit_mask[unit_index[i]]:
+                    n += 1
+            counts[c + 1] = n
+        offsets = np.cumsum(counts)
+        spike_indices = np.zeros(offsets[-1], dtype=np.int64)
+        for c in numba.prange(num_chunks):
+            j = offsets[c]
+            for i in range(c * chunk_size, min((c + 1) * chunk_size, num_spikes)):
+                if keep_unit_mask[unit_index[i]]:
+                    spike_indices[j] = i
+                    j += 1
+        return spike_indices
+
+    # Cache the compiled function
+    get_numba_select_spike_indices._cached_numba_function = select_spike_indices_numba
+
+    return select_spike_indices_numba
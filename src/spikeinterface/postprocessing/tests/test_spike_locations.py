@@ -1,7 +1,10 @@
 import unittest
+import pytest
 import numpy as np
 
+from spikeinterface.core import NumpySorting, create_sorting_analyzer
 from spikeinterface.postprocessing import ComputeSpikeLocations
+from spikeinterface.postprocessing.spike_locations import HAVE_NUMBA
 from spikeinterface.postprocessing.tests.common_extension_tests import AnalyzerExtensionCommonTestSuite
 
 
@@ -19,6 +22,135 @@ class SpikeLocationsExtensionTest(AnalyzerExtensionCommonTestSuite, unittest.Tes
         dict(method="grid_convolution"),  # , chunk_size=10000, n_jobs=1
     ]
 
+    def test_get_data_by_unit(self):
+        sorting_analyzer = self._prepare_sorting_analyzer(format="memory", sparse=False)
+        ext = sorting_analyzer.compute(self.extension_name, method="center_of_mass")
+        all_spike_locations = ext.get_data()
+        spike_locations_by_unit = ext.get_data(outputs="by_unit")
+
+        spikes = sorting_analyzer.sorting.to_spike_vector()
+        for segment_index in range(sorting_analyzer.get_num_segments()):
+            for unit_index, unit_id in enumerate(sorting_analyzer.unit_ids):
+                mask = (spikes["segment_index"] == segment_index) & (spikes["unit_index"] == unit_index)
+                assert np.array_equal(spike_locations_by_unit[segment_index][unit_id], all_spike_locations[mask])
+
+    def test_spike_locations_dtype(self):
+        sorting_analyzer = self._prepare_sorting_analyzer(format="memory", sparse=False)
+        for method in ("center_of_mass", "monopolar_triangulation"):
+            ext = sorting_analyzer.compute(self.extension_name, method=method)
+            spike_locations = ext.get_data()
+            assert all(spike_locations.dtype[name] == np.float32 for name in spike_locations.dtype.names)
+
+    def test_select_units(self):
+        sorting_analyzer = self._prepare_sorting_analyzer(format="memory", sparse=False)
+        ext = sorting_analyzer.compute(self.extension_name, method="center_of_mass")
+        spike_locations = ext.get_data()
+        spikes = sorting_analyzer.sorting.to_spike_vector()
+
+        all_units = sorting_analyzer.select_units(sorting_analyzer.unit_ids[::-1])
+        assert np.array_equal(all_units.get_extension(self.extension_name).get_data(), spike_locations)
+
+        some_unit_ids = sorting_analyzer.unit_ids[::2]
+        some_units = sorting_analyzer.select_units(some_unit_ids)
+        mask = np.isin(spikes["unit_index"], np.flatnonzero(np.isin(sorting_analyzer.unit_ids, some_unit_ids)))
+        assert np.array_equal(some_units.get_extension(self.extension_name).get_data(), spike_locations[mask])
+
+    def test_binary_folder(self):
+        sorting_analyzer = self._prepare_sorting_analyzer(format="memory", sparse=False)
+        spike_locations = sorting_analyzer.compute(self.extension_name, method="center_of_mass").get_data()
+
+        sorting_analyzer = self._prepare_sorting_analyzer(format="binary_folder", sparse=False)
+        extension_folder = sorting_analyzer.folder / "extensions" / self.extension_name
+
+        # without saving nothing is written in the extension folder
+        ext = sorting_analyzer.compute(self.extension_name, method="center_of_mass", save=False)
+        assert np.array_equal(ext.get_data(), spike_locations)
+        assert not (extension_folder / "spike_locations.npy").exists()
+
+        # locations are gathered directly in the npy file
+        ext = sorting_analyzer.compute(self.extension_name, method="center_of_mass")
+        assert isinstance(ext.data["spike_locations"], np.memmap)
+        assert np.array_equal(ext.get_data(), spike_locations)
+        assert (extension_folder / "params.json").exists()
+        assert np.array_equal(np.load(extension_folder / "spike_locations.npy"), spike_locations)
+
+        # the sliced analyzer does not keep a memmap into this folder
+        all_units = sorting_analyzer.select_units(sorting_analyzer.unit_ids, format="memory")
+        all_units_spike_locations = all_units.get_extension(self.extension_name).data["spike_locations"]
+        assert not isinstance(all_units_spike_locations, np.memmap)
+        assert np.array_equal(all_units_spike_locations, spike_locations)
+
+    def test_unsorted_spike_vector(self):
+        # shuffle spikes inside each segment
+        spikes = self.sorting.to_spike_vector()
+        rng = np.random.default_rng(seed=2205)
+        perm = np.arange(spikes.size)
+        for segment_index in range(self.sorting.get_num_segments()):
+            (inds,) = np.nonzero(spikes["segment_index"] == segment_index)
+            perm[inds] = rng.permutation(inds)
+        unsorted_sorting = NumpySorting(spikes[perm], self.sorting.sampling_frequency, self.sorting.unit_ids)
+
+        spike_locations_by_sorting = []
+        for sorting in (self.sorting, unsorted_sorting):
+            sorting_analyzer = create_sorting_analyzer(sorting, self.recording, format="memory", sparse=False)
+            sorting_analyzer.compute("random_spikes", method="all")
+            sorting_analyzer.compute("templates")
+            # the pipeline path of compute_several_extensions() must give the same result as _run()
+            sorting_analyzer.compute(["spike_locations"])
+            spike_locations = sorting_analyzer.get_extension(self.extension_name).get_data()
+            ext = sorting_analyzer.compute(self.extension_name)
+            assert np.array_equal(ext.get_data(), spike_locations)
+            spike_locations_by_sorting.append(spike_locations)
+        assert ext._sort_perm is not None
+
+        spike_locations, unsorted_spike_locations = spike_locations_by_sorting
+        assert np.allclose(unsorted_spike_locations.view("float32"), spike_locations[perm].view("float32"))
+
+    def test_selected_unit_ids(self):
+        sorting_analyzer = self._prepare_sorting_analyzer(format="memory", sparse=False)
+        spike_locations = sorting_analyzer.compute(self.extension_name, method="center_of_mass").get_data()
+
+        selected_unit_ids = sorting_analyzer.unit_ids[::2]
+        ext = sorting_analyzer.compute(
+            self.extension_name, method="center_of_mass", selected_unit_ids=selected_unit_ids
+        )
+        selected_spike_locations = ext.get_data()
+        assert selected_spike_locations.size == spike_locations.size
+
+        spikes = sorting_analyzer.sorting.to_spike_vector()
+        mask = np.isin(spikes["unit_index"], np.flatnonzero(np.isin(sorting_analyzer.unit_ids, selected_unit_ids)))
+        assert np.allclose(selected_spike_locations[mask].view("float32"), spike_locations[mask].view("float32"))
+        assert np.all(np.isnan(selected_spike_locations[~mask].view("float32")))
+
+        with pytest.raises(AssertionError):
+            sorting_analyzer.compute(self.extension_name, selected_unit_ids=["nonexistent"])
+
+        # same output through compute_several_extensions() which does not use _run()
+        sorting_analyzer.compute(
+            {self.extension_name: dict(selected_unit_ids=selected_unit_ids), "spike_amplitudes": {}}
+        )
+        ext = sorting_analyzer.get_extension(self.extension_name)
+        assert np.array_equal(ext.get_data().view("float32"), selected_spike_locations.view("float32"), equal_nan=True)
+        spike_locations_by_unit = ext.get_data(outputs="by_unit")
+        for segment_index in range(sorting_analyzer.get_num_segments()):
+            for unit_id in selected_unit_ids:
+                assert not np.any(np.isnan(spike_locations_by_unit[segment_index][unit_id].view("float32")))
+
+
+@pytest.mark.skipif(not HAVE_NUMBA, reason="numba not installed")
+def test_numba_select_spike_indices():
+    from spikeinterface.postprocessing.spike_locations import get_numba_select_spike_indices
+
+    rng = np.random.default_rng(seed=2205)
+    unit_index = rng.integers(0, 10, size=10_001).astype("int16")
+    keep_unit_mask = np.zeros(10, dtype=bool)
+    keep_unit_mask[[1, 4, 5]] = True
+
+    select_spike_indices = get_numba_select_spike_indices()
+    for num_chunks in (1, 3, 8):
+        spike_indices = select_spike_indices(unit_index, keep_unit_mask, num_chunks)
+        assert np.array_equal(spike_indices, np.flatnonzero(keep_unit_mask[unit_index]))
+
 
 if __name__ == "__main__":
     test = SpikeLocationsExtensionTest()
@@ -677,5 +677,96 @@ def get_convolution_weights(
     return weights, z_factors
 
 
+# feature code used by the numba center of mass kernel
+_center_of_mass_features = {"ptp": 0, "mean": 1, "energy": 2, "peak_voltage": 3}
+
+
 if HAVE_NUMBA:
     enforce_decrease_shells = numba.jit(enforce_decrease_shells_data, nopython=True)
+
+    @numba.jit(nopython=True, nogil=True, cache=False)
+    def _numba_center_of_mass_feature(wf, feature, nbefore):
+        # wf is the 1d waveform of one spike on one channel
+        num_samples = wf.size
+        if feature == 0:
+            vmin = wf[0]
+            vmax = wf[0]
+            for s in range(1, num_samples):
+                if wf[s] < vmin:
+                    vmin = wf[s]
+                if wf[s] > vmax:
+                    vmax = wf[s]
+            w = float(vmax) - float(vmin)
+        elif feature == 1:
+            w = 0.0
+            for s in range(num_samples):
+                w += wf[s]
+            w /= num_samples
+        elif feature == 2:
+            w = 0.0
+            for s in range(num_samples):
+                w += float(wf[s]) ** 2
+            w = np.sqrt(w)
+        else:
+            w = float(wf[nbefore])
+        return w
+
+    # error_model="numpy" and no fastmath: a zero total gives inf/nan like the numpy implementation
+    @numba.jit(nopython=True, nogil=True, cache=False, error_model="numpy")
+    def _numba_center_of_mass(waveforms, spike_inds, chan_inds, local_contact_locations, feature, nbefore, out):
+        """
+        Center of mass of waveforms[spike_inds][:, :, chan_inds] computed spike per spike in one fused loop.
+        The feature (ptp, mean, energy, peak_voltage) is computed on the fly so no sparse waveforms copy is made.
+        This is called per main channel in each chunk, which are already processed in parallel by the
+        ChunkRecordingExecutor, so the kernel is not parallel.
+        """
+        num_chans = chan_inds.size
+        ndim = local_contact_locations.shape[1]
+        for k in range(spike_inds.size):
+            i = spike_inds[k]
+            total = 0.0
+            for d in range(ndim):
+                out[k, d] = 0.0
+            for c in range(num_chans):
+                w = _numba_center_of_mass_feature(waveforms[i, :, chan_inds[c]], feature, nbefore)
+                total += w
+                for d in range(ndim):
+                    out[k, d] += w * local_contact_locations[c, d]
+            for d in range(ndim):
+                out[k, d] /= total
+
+    @numba.jit(nopython=True, nogil=True, cache=False, error_model="numpy")
+    def _numba_center_of_mass_from_traces(
+        traces,
+        sample_indices,
+        main_chans,
+        neighbours_table,
+        num_neighbours,
+        neighbours_locations,
+        feature,
+        nbefore,
+        nafter,
+        out,
+    ):
+        """
+        Same as _numba_center_of_mass but reading the samples directly in the traces around each sample index,
+        so the (num_spikes, num_samples, num_channels) waveforms buffer is never allocated.
+        The neighbours channels and their locations are gathered per spike from tables indexed by main channel.
+        This is called once per chunk, which are already processed in parallel by the ChunkRecordingExecutor,
+        so the kernel is not parallel: a parallel=True compilation is much slower for only a few spikes per chunk.
+        """
+        ndim = neighbours_locations.shape[2]
+        for k in range(sample_indices.size):
+            s0 = sample_indices[k] - nbefore
+            s1 = sample_indices[k] + nafter
+            main_chan = main_chans[k]
+            total = 0.0
+            for d in range(ndim):
+                out[k, d] = 0.0
+            for c in range(num_neighbours[main_chan]):
+                w = _numba_center_of_mass_feature(traces[s0:s1, neighbours_table[main_chan, c]], feature, nbefore)
+                total += w
+                for d in range(ndim):
+                    out[k, d] += w * neighbours_locations[main_chan, c, d]
+            for d in range(ndim):
+                out[k, d] /= total
@@ -22,6 +22,7 @@ from .tools import make_multi_method_doc
 from spikeinterface.core import get_channel_distances
 
 from ..postprocessing.unit_localization import (
+    HAVE_NUMBA,
     dtype_localize_by_method,
     possible_localization_methods,
     solve_monopolar_triangulation,
@@ -30,6 +31,13 @@ from ..postprocessing.unit_localization import (
     get_grid_convolution_templates_and_weights,
 )
 
+if HAVE_NUMBA:
+    from ..postprocessing.unit_localization import (
+        _numba_center_of_mass,
+        _numba_center_of_mass_from_traces,
+        _center_of_mass_features,
+    )
+
 from .tools import get_prototype_spike
 
 
@@ -118,7 +126,7 @@ def localize_peaks(recording, peaks, method="center_of_mass", ms_before=0.5, ms_
 
 
 class LocalizeBase(PipelineNode):
-    def __init__(self, recording, return_output=True, parents=None, radius_um=75.0):
+    def __init__(self, recording, return_output=True, parents=None, radius_um=75.0, dtype="float64"):
         PipelineNode.__init__(self, recording, return_output=return_output, parents=parents)
 
         self.radius_um = radius_um
@@ -127,6 +135,10 @@ class LocalizeBase(PipelineNode):
         self.neighbours_mask = self.channel_distance < radius_um
         self._kwargs["radius_um"] = radius_um
 
+        # the fields of the output depend on the method, dtype is the float type of all fields
+        self._dtype = np.dtype([(field, dtype) for field, _ in dtype_localize_by_method[self.name]])
+        self._kwargs["dtype"] = dtype
+
     def get_dtype(self):
         return self._dtype
 
@@ -138,9 +150,9 @@ class LocalizePeakChannel(PipelineNode):
     params_doc = """
     """
 
-    def __init__(self, recording, parents=None, return_output=True):
+    def __init__(self, recording, parents=None, return_output=True, dtype="float64"):
         PipelineNode.__init__(self, recording, return_output, parents=parents)
-        self._dtype = np.dtype(dtype_localize_by_method["center_of_mass"])
+        self._dtype = np.dtype([(field, dtype) for field, _ in dtype_localize_by_method["peak_channel"]])
 
         self.contact_locations = recording.get_channel_locations()
 
@@ -173,11 +185,22 @@ class LocalizeCenterOfMass(LocalizeBase):
         Radius in um for channel sparsity.
     feature: "ptp" | "mean" | "energy" | "peak_voltage", default: "ptp"
         Feature to consider for computation
+    dtype: str, default: "float64"
+        The float dtype of the estimated locations
     """
 
-    def __init__(self, recording, return_output=True, parents=["extract_waveforms"], radius_um=75.0, feature="ptp"):
-        LocalizeBase.__init__(self, recording, return_output=return_output, parents=parents, radius_um=radius_um)
-        self._dtype = np.dtype(dtype_localize_by_method["center_of_mass"])
+    def __init__(
+        self,
+        recording,
+        return_output=True,
+        parents=["extract_waveforms"],
+        radius_um=75.0,
+        feature="ptp",
+        dtype="float64",
+    ):
+        LocalizeBase.__init__(
+            self, recording, return_output=return_output, parents=parents, radius_um=radius_um, dtype=dtype
+        )
 
         assert feature in ["ptp", "mean", "energy", "peak_voltage"], f"{feature} is not a valid feature"
         self.feature = feature
@@ -201,7 +224,116 @@ class LocalizeCenterOfMass(LocalizeBase):
             (chan_inds,) = np.nonzero(self.neighbours_mask[main_chan])
             local_contact_locations = self.contact_locations[chan_inds, :]
 
-            wf = waveforms[idx][:, :, chan_inds]
+            if HAVE_NUMBA:
+                coms = np.zeros((idx.size, local_contact_locations.shape[1]), dtype="float64")
+                _numba_center_of_mass(
+                    waveforms,
+                    idx,
+                    chan_inds,
+                    local_contact_locations,
+                    _center_of_mass_features[self.feature],
+                    self.nbefore,
+                    coms,
+                )
+            else:
+                wf = waveforms[idx][:, :, chan_inds]
+
+                if self.feature == "ptp":
+                    wf_data = wf.ptp(axis=1)
+                elif self.feature == "mean":
+                    wf_data = wf.mean(axis=1)
+                elif self.feature == "energy":
+                    wf_data = np.linalg.norm(wf, axis=1)
+                elif self.feature == "peak_voltage":
+                    wf_data = wf[:, self.nbefore]
+
+                coms = np.dot(wf_data, local_contact_locations) / (np.sum(wf_data, axis=1)[:, np.newaxis])
+            peak_locations["x"][idx] = coms[:, 0]
+            peak_locations["y"][idx] = coms[:, 1]
+
+        return peak_locations
+
+
+class LocalizeCenterOfMassFused(LocalizeBase):
+    """Localize peaks using the center of mass method, reading the traces directly.
+
+    This gives the same result as ExtractDenseWaveforms + LocalizeCenterOfMass but the waveforms
+    extraction and the center of mass are fused: only the neighbour channels of each peak are read
+    in the traces and the (num_peaks, num_samples, num_channels) waveforms buffer is never allocated.
+    It needs a PeakSource (PeakRetriever or SpikeRetriever) as parent.
+    """
+
+    name = "center_of_mass"
+
+    def __init__(
+        self,
+        recording,
+        return_output=True,
+        parents=None,
+        ms_before=0.5,
+        ms_after=0.5,
+        radius_um=75.0,
+        feature="ptp",
+        dtype="float64",
+    ):
+        LocalizeBase.__init__(
+            self, recording, return_output=return_output, parents=parents, radius_um=radius_um, dtype=dtype
+        )
+
+        assert feature in ["ptp", "mean", "energy", "peak_voltage"], f"{feature} is not a valid feature"
+        self.feature = feature
+
+        self.nbefore = int(ms_before * recording.get_sampling_frequency() / 1000.0)
+        self.nafter = int(ms_after * recording.get_sampling_frequency() / 1000.0)
+        self._kwargs.update(dict(ms_before=ms_before, ms_after=ms_after, feature=feature))
+
+        # lookup tables indexed by main channel, padded to the max number of neighbours
+        # (with -1 for channels and NaN for locations), so that no mask is needed per chunk
+        num_channels, ndim = self.contact_locations.shape
+        self.num_neighbours = np.sum(self.neighbours_mask, axis=1).astype("int64")
+        max_num_neighbours = np.max(self.num_neighbours)
+        self.neighbours_table = np.full((num_channels, max_num_neighbours), -1, dtype="int64")
+        self.neighbours_locations = np.full((num_channels, max_num_neighbours, ndim), np.nan, dtype="float64")
+        for main_chan in range(num_channels):
+            (chan_inds,) = np.nonzero(self.neighbours_mask[main_chan])
+            self.neighbours_table[main_chan, : chan_inds.size] = chan_inds
+            self.neighbours_locations[main_chan, : chan_inds.size] = self.contact_locations[chan_inds, :]
+
+    def get_trace_margin(self):
+        return max(self.nbefore, self.nafter)
+
+    def compute(self, traces, peaks):
+        peak_locations = np.zeros(peaks.size, dtype=self._dtype)
+
+        if HAVE_NUMBA:
+            coms = np.zeros((peaks.size, self.neighbours_locations.shape[2]), dtype="float64")
+            _numba_center_of_mass_from_traces(
+                traces,
+                peaks["sample_index"],
+                peaks["channel_index"],
+                self.neighbours_table,
+                self.num_neighbours,
+                self.neighbours_locations,
+                _center_of_mass_features[self.feature],
+                self.nbefore,
+                self.nafter,
+                coms,
+            )
+            peak_locations["x"] = coms[:, 0]
+            peak_locations["y"] = coms[:, 1]
+            return peak_locations
+
+        for main_chan in np.unique(peaks["channel_index"]):
+            (idx,) = np.nonzero(peaks["channel_index"] == main_chan)
+            chan_inds = self.neighbours_table[main_chan, : self.num_neighbours[main_chan]]
+            local_contact_locations = self.neighbours_locations[main_chan, : self.num_neighbours[main_chan]]
+            sample_indices = peaks["sample_index"][idx]
+
+            # sparse waveforms (num_peaks, num_samples, num_neighbours) only
+            wf = traces[
+                sample_indices[:, None, None] + np.arange(-self.nbefore, self.nafter)[None, :, None],
+                chan_inds[None, None, :],
+            ]
 
             if self.feature == "ptp":
                 wf_data = wf.ptp(axis=1)
@@ -213,13 +345,14 @@ class LocalizeCenterOfMass(LocalizeBase):
                 wf_data = wf[:, self.nbefore]
 
             coms = np.dot(wf_data, local_contact_locations) / (np.sum(wf_data, axis=1)[:, np.newaxis])
+
             peak_locations["x"][idx] = coms[:, 0]
             peak_locations["y"][idx] = coms[:, 1]
 
         return peak_locations
 
 
-class LocalizeMonopolarTriangulation(PipelineNode):
+class LocalizeMonopolarTriangulation(LocalizeBase):
     """Localize peaks using the monopolar triangulation method.
 
     Notes
@@ -242,6 +375,8 @@ class LocalizeMonopolarTriangulation(PipelineNode):
         monopolar triangulation are peak-to-peak amplitudes (ptp, default),
         energy ("energy", as L2 norm) or voltages at the center of the waveform
         (peak_voltage)
+    dtype: str, default: "float64"
+        The float dtype of the estimated locations
     """
 
     def __init__(
@@ -254,8 +389,11 @@ class LocalizeMonopolarTriangulation(PipelineNode):
         optimizer="minimize_with_log_penality",
         enforce_decrease=True,
         feature="ptp",
+        dtype="float64",
     ):
-        LocalizeBase.__init__(self, recording, return_output=return_output, parents=parents, radius_um=radius_um)
+        LocalizeBase.__init__(
+            self, recording, return_output=return_output, parents=parents, radius_um=radius_um, dtype=dtype
+        )
 
         assert feature in ["ptp", "energy", "peak_voltage"], f"{feature} is not a valid feature"
         self.max_distance_um = max_distance_um
@@ -280,8 +418,6 @@ class LocalizeMonopolarTriangulation(PipelineNode):
             )
         )
 
-        self._dtype = np.dtype(dtype_localize_by_method["monopolar_triangulation"])
-
     def compute(self, traces, peaks, waveforms):
         peak_locations = np.zeros(peaks.size, dtype=self._dtype)
 
@@ -311,7 +447,7 @@ class LocalizeMonopolarTriangulation(PipelineNode):
         return peak_locations
 
 
-class LocalizeGridConvolution(PipelineNode):
+class LocalizeGridConvolution(LocalizeBase):
     """Localize peaks using convolution with a grid of fake templates
 
     Notes
@@ -341,6 +477,8 @@ class LocalizeGridConvolution(PipelineNode):
         Parameter that should be provided to the get_convolution_weights() function
         in order to know how to estimate the positions. One argument is mode that could
         be either gaussian_2d (KS like) or exponential_3d (default)
+    dtype: str, default: "float64"
+        The float dtype of the estimated locations
     """
 
     def __init__(
@@ -356,10 +494,12 @@ class LocalizeGridConvolution(PipelineNode):
         percentile=5.0,
         peak_sign="neg",
         weight_method={},
+        dtype="float64",
     ):
-        PipelineNode.__init__(self, recording, return_output=return_output, parents=parents)
+        LocalizeBase.__init__(
+            self, recording, return_output=return_output, parents=parents, radius_um=radius_um, dtype=dtype
+        )
 
-        self.radius_um = radius_um
         self.margin_um = margin_um
         self.upsampling_um = upsampling_um
         self.peak_sign = peak_sign
@@ -400,7 +540,6 @@ class LocalizeGridConvolution(PipelineNode):
         )
 
         self.weights_sparsity_mask = self.weights > 0
-        self._dtype = np.dtype(dtype_localize_by_method["grid_convolution"])
         self._kwargs.update(
             dict(
                 radius_um=self.radius_um,
@@ -2,9 +2,11 @@ import pytest
 import numpy as np
 
 from spikeinterface.sortingcomponents.peak_detection import detect_peaks
-from spikeinterface.sortingcomponents.peak_localization import localize_peaks
+from spikeinterface.sortingcomponents.peak_localization import localize_peaks, LocalizeCenterOfMassFused
+from spikeinterface.core.node_pipeline import PeakRetriever, run_node_pipeline
 
 from spikeinterface.sortingcomponents.tests.common import make_dataset
+from spikeinterface.postprocessing.unit_localization import HAVE_NUMBA
 
 
 def test_localize_peaks():
@@ -76,6 +78,11 @@ def test_localize_peaks():
 
     peak_locations = localize_peaks(recording, peaks, method="peak_channel", **job_kwargs)
     assert peaks.size == peak_locations.shape[0]
+
+    # the float type of the locations can be chosen
+    for method in ("center_of_mass", "grid_convolution", "peak_channel"):
+        float32_locations = localize_peaks(recording, peaks, method=method, dtype="float32", **job_kwargs)
+        assert all(float32_locations.dtype[name] == np.float32 for name in float32_locations.dtype.names)
     list_locations.append(("peak_channel", peak_locations))
 
     # DEBUG
@@ -109,5 +116,63 @@ def test_localize_peaks():
     # plt.show()
 
 
+def test_localize_center_of_mass_fused():
+    recording, _ = make_dataset()
+    job_kwargs = dict(n_jobs=1, chunk_size=10000, progress_bar=False)
+
+    peaks = detect_peaks(
+        recording, method="locally_exclusive", peak_sign="neg", detect_threshold=5, exclude_sweep_ms=0.1, **job_kwargs
+    )
+    peak_locations = localize_peaks(recording, peaks, method="center_of_mass", **job_kwargs)
+
+    peak_retriever = PeakRetriever(recording, peaks)
+    nodes = [peak_retriever, LocalizeCenterOfMassFused(recording, parents=[peak_retriever])]
+    peak_locations_fused = run_node_pipeline(recording, nodes, job_kwargs, squeeze_output=True)
+
+    assert peak_locations_fused.dtype == peak_locations.dtype
+    for dim in ("x", "y"):
+        assert np.allclose(peak_locations_fused[dim], peak_locations[dim])
+
+
+@pytest.mark.skipif(not HAVE_NUMBA, reason="numba not installed")
+def test_numba_center_of_mass():
+    from spikeinterface.postprocessing.unit_localization import _numba_center_of_mass, _center_of_mass_features
+
+    rng = np.random.default_rng(seed=2205)
+    waveforms = rng.normal(size=(20, 30, 8)).astype("float32")
+    spike_inds = np.arange(0, 20, 2)
+    chan_inds = np.array([1, 2, 4, 5])
+    local_contact_locations = rng.uniform(0, 100, size=(chan_inds.size, 2))
+    nbefore = 10
+
+    wf = waveforms[spike_inds][:, :, chan_inds]
+    numpy_features = {
+        "ptp": wf.ptp(axis=1),
+        "mean": wf.mean(axis=1),
+        "energy": np.linalg.norm(wf, axis=1),
+        "peak_voltage": wf[:, nbefore],
+    }
+    for feature, wf_data in numpy_features.items():
+        expected = np.dot(wf_data, local_contact_locations) / (np.sum(wf_data, axis=1)[:, np.newaxis])
+        coms = np.zeros((spike_inds.size, 2), dtype="float64")
+        _numba_center_of_mass(
+            waveforms, spike_inds, chan_inds, local_contact_locations, _center_of_mass_features[feature], nbefore, coms
+        )
+        assert np.allclose(coms, expected, rtol=1e-4)
+
+    # a zero total gives nan like numpy
+    coms = np.zeros((spike_inds.size, 2), dtype="float64")
+    _numba_center_of_mass(
+        np.zeros_like(waveforms),
+        spike_inds,
+        chan_inds,
+        local_contact_locations,
+        _center_of_mass_features["ptp"],
+        0,
+        coms,
+    )
+    assert np.all(np.isnan(coms))
+
+
 if __name__ == "__main__":
     test_localize_peaks()